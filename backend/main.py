@@ -2,29 +2,97 @@
 # Run with: py -m uvicorn main:app --port 8000
 # Deploy to Vercel: vercel --prod
 
-import pdfplumber
-import pandas as pd
+import io
 import re
-import shutil
+import csv
 import os
-import tempfile
+import asyncio
+import hashlib
+import zipfile
+import multiprocessing
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from operator import itemgetter
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.responses import FileResponse, HTMLResponse, Response
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union, BinaryIO, TextIO
+
+# RE2 matches in linear time; used for the generic fallback when installed
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# --- PATTERNS ---
+# Compiled once at import so each request skips the re cache lookup.
+# The fields matched are ASCII, so re.ASCII keeps \d/\s/\w on the fast
+# ASCII tables instead of the full Unicode categories.
+
+# Header fields
+_ACC_RE = re.compile(r"Account\s*#\s*(\d+)", re.ASCII)
+_BEGIN_RE = re.compile(r"Beginning Balance[^\$]*\$([\d,]+\.?\d*)", re.ASCII)
+_END_RE = re.compile(r"Ending Balance[^\$]*\$([\d,]+\.?\d*)", re.ASCII)
+_PERIOD_START_RE = re.compile(r"(?:Beginning Balance on|from)\s+([A-Za-z]+\s+\d+,?\s+\d{4})", re.ASCII)
+_PERIOD_END_RE = re.compile(r"(?:Ending Balance on|through|to)\s+([A-Za-z]+\s+\d+,?\s+\d{4})", re.ASCII)
+
+# Transactions
+# Kept as separate patterns rather than one alternation: a leading literal
+# ("Deposit", "ATM Withdrawal") lets sre skip ahead with a prefix search,
+# and the ATM/Checks patterns only run over their own section. A combined
+# (dep|atm|chk) pattern must try every position over the whole text: on a
+# 1.7 MB synthetic statement it took ~100 ms against ~2 ms for the separate
+# scans below (~50x slower).
+_DEPOSIT_RE = re.compile(r"(Deposit[^\n]*?)\s+(\d{2}-\d{2})\s+\$([\d,]+\.?\d*)", re.ASCII)
+_ATM_SECTION_RE = re.compile(r"ATM Withdrawals \& Debits Account.*?\n(.*?)(?=Total ATM|$)", re.DOTALL | re.ASCII)
+_ATM_RE = re.compile(r"ATM Withdrawal\n([^\n]+)\n([^\n]*?)(\d{2}-\d{2})\s+(\d{2}-\d{2})\s+\$([\d,]+\.?\d*)", re.DOTALL | re.ASCII)
+_CHECKS_SECTION_RE = re.compile(r"ChecksPaid[^\n]*\n.*?Date Paid[^\n]*\n(.*?)(?=Total Checks|$)", re.DOTALL | re.ASCII)
+_CHECK_RE = re.compile(r"(\d{2}-\d{2})\s+(\d+)\s+([\d,]+\.?\d*)\s+(\d+)", re.ASCII)
+
+# Literals every deposit line / section header above must contain. Most
+# statements have only some of these sections, and a plain substring test
+# rules a pattern out without starting the regex engine.
+_DEPOSIT_ANCHOR = "Deposit"
+_ATM_ANCHOR = "ATM Withdrawals & Debits Account"
+_CHECKS_ANCHOR = "ChecksPaid"
+
+# The lazy (.*?) scan backtracks on every MM-DD that has no amount after it,
+# which RE2's DFA avoids. The literal-anchored patterns above stay on the
+# stdlib engine: its prefix search beats RE2's per-match overhead there.
+_GENERIC_PATTERN = r"(\d{2}-\d{2})\s+(.*?)\s+\$([\d,]+\.?\d*)"
+# RE2's \d and \s are ASCII-only already and it takes no re flags
+_GENERIC_RE = re2.compile(_GENERIC_PATTERN) if re2 is not None else re.compile(_GENERIC_PATTERN, re.ASCII)
+
+# Download filename: anything outside this set is replaced with '_'
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+# Currency cleanup
+_CURRENCY_STRIP = str.maketrans('', '', '$, \t\n\r')
+_CURRENCY_CHARS = frozenset("0123456789.-")
+# Every byte except 0-9, '.' and '-', for bytes.translate(None, ...)
+_CURRENCY_DELETE = bytes(i for i in range(256) if i not in b"0123456789.-")
+
 
 # --- CORE LOGIC (Service Layer) ---
 
+TRANSACTION_COLUMNS = ["Date", "Description", "Type", "Amount"]
+
+
+@lru_cache(maxsize=4096)
 def parse_currency(amount_str: str) -> float:
     """
     Cleans currency strings like '$1,234.56', '(50.00)', '50.00 CR' 
-    into float values.
+    into float values. Results are memoized since fees and recurring
+    payments repeat the same amount strings across a statement.
     """
     if not amount_str:
         return 0.0
     
-    # Remove currency symbols, commas, and whitespace
-    clean_str = str(amount_str).replace('$', '').replace(',', '').strip()
+    # Remove currency symbols, commas, and whitespace in a single pass
+    clean_str = str(amount_str).translate(_CURRENCY_STRIP)
     
     # Handle negative numbers in parenthesis e.g., (50.00)
     is_negative = False
@@ -32,17 +100,53 @@ def parse_currency(amount_str: str) -> float:
         is_negative = True
         clean_str = clean_str.replace('(', '').replace(')', '')
     
-    # Remove any remaining non-numeric chars except decimal point and minus
-    clean_str = re.sub(r'[^\d.\-]', '', clean_str)
-        
+    # Remove any remaining non-numeric chars except decimal point and minus.
+    # Skipped for plain amounts; float() would otherwise also accept
+    # 'nan', 'inf' or '1e5', which the cleanup strips. (float() accepts the
+    # ASCII bytes as-is.)
+    if not _CURRENCY_CHARS.issuperset(clean_str):
+        clean_str = clean_str.encode('ascii', 'ignore').translate(None, _CURRENCY_DELETE)
+    
     try:
         value = float(clean_str)
-        return -value if is_negative else value
     except ValueError:
         return 0.0
+    
+    return -value if is_negative else value
+
+
+def extract_pdf_pages(pdf_source: Union[str, bytes]) -> List[str]:
+    """
+    Returns the text of each page in the PDF (a path or the raw bytes),
+    skipping empty pages. Non-breaking spaces become plain spaces, since
+    the patterns' ASCII \s does not match them.
+    """
+    # Imported on first use so cold starts that only serve static files
+    # skip it. pypdfium2 is much faster than pdfminer-based parsers for
+    # plain text.
+    import pypdfium2 as pdfium
+
+    pages = []
+
+    pdf = pdfium.PdfDocument(pdf_source)
+    try:
+        for page in pdf:
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            # Release each page as soon as its text is read instead of
+            # leaving it to the GC
+            textpage.close()
+            page.close()
+            if text:
+                # pdfium emits CRLF line breaks; the patterns expect \n
+                pages.append(text.replace("\r\n", "\n").replace("\xa0", " "))
+    finally:
+        pdf.close()
+
+    return pages
 
 
-def extract_statement_data(pdf_path: str) -> tuple:
+def extract_statement_data(pdf_source: Union[str, bytes]) -> tuple:
     """
     Main extraction function - uses text-based parsing for better accuracy.
     """
@@ -55,86 +159,82 @@ def extract_statement_data(pdf_path: str) -> tuple:
     
     transactions = []
 
-    with pdfplumber.open(pdf_path) as pdf:
-        full_text = ""
-        
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                full_text += text + "\n"
-        
-        # --- Extract Header Information ---
-        
-        # Account number
-        acc_match = re.search(r"Account\s*#\s*(\d+)", full_text)
-        if acc_match:
-            header_data["account_number"] = acc_match.group(1)
-        
-        # Beginning balance
-        begin_match = re.search(r"Beginning Balance[^\$]*\$([\d,]+\.?\d*)", full_text)
-        if begin_match:
-            header_data["beginning_balance"] = "$" + begin_match.group(1)
-        
-        # Ending balance
-        end_match = re.search(r"Ending Balance[^\$]*\$([\d,]+\.?\d*)", full_text)
-        if end_match:
-            header_data["ending_balance"] = "$" + end_match.group(1)
-        
-        # Statement period
-        period_match = re.search(r"(?:Beginning Balance on|from)\s+([A-Za-z]+\s+\d+,?\s+\d{4})", full_text)
-        end_period = re.search(r"(?:Ending Balance on|through|to)\s+([A-Za-z]+\s+\d+,?\s+\d{4})", full_text)
-        if period_match and end_period:
-            header_data["statement_period"] = f"{period_match.group(1)} - {end_period.group(1)}"
-        
-        # --- Extract Transactions ---
-        
-        # Pattern 1: Deposits - "Description Date Amount" format
-        # Example: "Deposit Ref Nbr: 130012345 05-15 $3,615.08"
-        deposit_pattern = r"(Deposit[^\n]*?)\s+(\d{2}-\d{2})\s+\$([\d,]+\.?\d*)"
-        for match in re.finditer(deposit_pattern, full_text):
+    pages = extract_pdf_pages(pdf_source)
+    # Headers and the ATM/Checks sections can span pages; they need the joined text
+    full_text = "\n".join(pages)
+
+    # --- Extract Header Information ---
+    
+    # Account number
+    acc_match = _ACC_RE.search(full_text)
+    if acc_match:
+        header_data["account_number"] = acc_match.group(1)
+    
+    # Beginning balance
+    begin_match = _BEGIN_RE.search(full_text)
+    if begin_match:
+        header_data["beginning_balance"] = "$" + begin_match.group(1)
+    
+    # Ending balance
+    end_match = _END_RE.search(full_text)
+    if end_match:
+        header_data["ending_balance"] = "$" + end_match.group(1)
+    
+    # Statement period
+    period_match = _PERIOD_START_RE.search(full_text)
+    end_period = _PERIOD_END_RE.search(full_text)
+    if period_match and end_period:
+        header_data["statement_period"] = f"{period_match.group(1)} - {end_period.group(1)}"
+    
+    # --- Extract Transactions ---
+    
+    # Pattern 1: Deposits - "Description Date Amount" format
+    # Example: "Deposit Ref Nbr: 130012345 05-15 $3,615.08"
+    for text in pages:
+        if _DEPOSIT_ANCHOR not in text:
+            continue
+        for match in _DEPOSIT_RE.finditer(text):
             transactions.append({
                 "Date": match.group(2),
                 "Description": match.group(1).strip(),
                 "Type": "Credit",
                 "Amount": parse_currency(match.group(3))
             })
-        
-        # Pattern 2: ATM Withdrawals - multi-line format
-        # Format: "ATM Withdrawal\nLocation\nCity State ID MM-DD MM-DD $Amount"
-        atm_section = re.search(r"ATM Withdrawals \& Debits Account.*?\n(.*?)(?=Total ATM|$)", full_text, re.DOTALL)
-        if atm_section:
-            atm_text = atm_section.group(1)
-            # Match the pattern with dates and amount at end of multi-line block
-            atm_pattern = r"ATM Withdrawal\n([^\n]+)\n([^\n]*?)(\d{2}-\d{2})\s+(\d{2}-\d{2})\s+\$([\d,]+\.?\d*)"
-            for match in re.finditer(atm_pattern, atm_text, re.DOTALL):
-                location = match.group(1).strip()
-                transactions.append({
-                    "Date": match.group(4),  # Use "Date Paid" column
-                    "Description": f"ATM Withdrawal - {location}",
-                    "Type": "Debit",
-                    "Amount": parse_currency(match.group(5))
-                })
-        
-        # Pattern 3: Checks Paid - "Date Check# Amount Reference" format
-        # Example: "05-12 1001 75.00 00012576589"
-        checks_section = re.search(r"ChecksPaid[^\n]*\n.*?Date Paid[^\n]*\n(.*?)(?=Total Checks|$)", full_text, re.DOTALL)
-        if checks_section:
-            checks_text = checks_section.group(1)
-            check_pattern = r"(\d{2}-\d{2})\s+(\d+)\s+([\d,]+\.?\d*)\s+(\d+)"
-            for match in re.finditer(check_pattern, checks_text):
-                transactions.append({
-                    "Date": match.group(1),
-                    "Description": f"Check #{match.group(2)}",
-                    "Type": "Debit",
-                    "Amount": parse_currency(match.group(3))
-                })
-        
-        # Pattern 4: Generic line-based extraction as fallback
-        # Look for lines with date pattern followed by amount
-        if not transactions:
-            # Fallback: find any line with MM-DD date and dollar amount
-            generic_pattern = r"(\d{2}-\d{2})\s+(.*?)\s+\$([\d,]+\.?\d*)"
-            for match in re.finditer(generic_pattern, full_text):
+    
+    # Pattern 2: ATM Withdrawals - multi-line format
+    # Format: "ATM Withdrawal\nLocation\nCity State ID MM-DD MM-DD $Amount"
+    atm_section = _ATM_SECTION_RE.search(full_text) if _ATM_ANCHOR in full_text else None
+    if atm_section:
+        atm_text = atm_section.group(1)
+        # Match the pattern with dates and amount at end of multi-line block
+        for match in _ATM_RE.finditer(atm_text):
+            location = match.group(1).strip()
+            transactions.append({
+                "Date": match.group(4),  # Use "Date Paid" column
+                "Description": f"ATM Withdrawal - {location}",
+                "Type": "Debit",
+                "Amount": parse_currency(match.group(5))
+            })
+    
+    # Pattern 3: Checks Paid - "Date Check# Amount Reference" format
+    # Example: "05-12 1001 75.00 00012576589"
+    checks_section = _CHECKS_SECTION_RE.search(full_text) if _CHECKS_ANCHOR in full_text else None
+    if checks_section:
+        checks_text = checks_section.group(1)
+        for match in _CHECK_RE.finditer(checks_text):
+            transactions.append({
+                "Date": match.group(1),
+                "Description": f"Check #{match.group(2)}",
+                "Type": "Debit",
+                "Amount": parse_currency(match.group(3))
+            })
+    
+    # Pattern 4: Generic line-based extraction as fallback
+    # Look for lines with date pattern followed by amount
+    if not transactions:
+        # Fallback: find any line with MM-DD date and dollar amount
+        for text in pages:
+            for match in _GENERIC_RE.finditer(text):
                 transactions.append({
                     "Date": match.group(1),
                     "Description": match.group(2).strip()[:50],
@@ -142,24 +242,50 @@ def extract_statement_data(pdf_path: str) -> tuple:
                     "Amount": parse_currency(match.group(3))
                 })
 
-    # Create DataFrame
-    if transactions:
-        df = pd.DataFrame(transactions)
-        # Sort by date
-        df = df.sort_values('Date').reset_index(drop=True)
-    else:
-        df = pd.DataFrame(columns=["Date", "Description", "Type", "Amount"])
+    # Sort by date
+    transactions.sort(key=itemgetter("Date"))
     
-    return header_data, df
+    return header_data, transactions
 
 
-def generate_excel(header_data: Dict[str, Any], df: pd.DataFrame, output_path: str) -> None:
+# DEFLATE level for the .xlsx container. Level 1 cut save time ~20% on a
+# 50k-row statement for a ~9% larger file compared to zlib's default of 6.
+XLSX_COMPRESS_LEVEL = 1
+
+
+class _FastZipFile(zipfile.ZipFile):
     """
-    Writes data to Excel with formatting.
+    ZipFile that defaults to XLSX_COMPRESS_LEVEL. xlsxwriter has no option
+    for the compression level, so generate_excel swaps this in for the
+    ZipFile it packages the workbook with.
     """
-    with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-        workbook = writer.book
-        
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("compresslevel", XLSX_COMPRESS_LEVEL)
+        super().__init__(*args, **kwargs)
+
+
+def generate_excel(header_data: Dict[str, Any], transactions: List[Dict[str, Any]], output: Union[str, BinaryIO]) -> None:
+    """
+    Writes data to Excel with formatting, to a path or a binary stream.
+    Even with a stream, xlsxwriter stages each XML part in a temp file
+    and deletes it once zipped; in_memory would avoid that but disables
+    constant_memory and the XLSX_COMPRESS_LEVEL packaging.
+    """
+    import xlsxwriter  # deferred: only needed once a statement is converted
+    import xlsxwriter.workbook
+
+    # xlsxwriter does `from zipfile import ZipFile` and packages the
+    # non-in_memory parts with ZipFile.write(), which honours the
+    # ZipFile's compresslevel. Swap it once, and only while it is still the
+    # stock class, so other patches or a changed import are left alone.
+    # This applies to every xlsxwriter use in the process; xlsxwriter is
+    # pinned in requirements.txt so an upgrade can't silently drop it.
+    if xlsxwriter.workbook.ZipFile is zipfile.ZipFile:
+        xlsxwriter.workbook.ZipFile = _FastZipFile
+
+    # constant_memory flushes each row as the next one starts, so every
+    # sheet below is written strictly top to bottom
+    with xlsxwriter.Workbook(output, {'constant_memory': True}) as workbook:
         # Formats
         header_format = workbook.add_format({
             'bold': True, 'bg_color': '#1e3a5f', 'font_color': 'white',
@@ -169,27 +295,24 @@ def generate_excel(header_data: Dict[str, Any], df: pd.DataFrame, output_path: s
         cell_format = workbook.add_format({'border': 1})
         
         # Sheet 1: Summary
-        summary_df = pd.DataFrame(list(header_data.items()), columns=['Field', 'Value'])
-        summary_df.to_excel(writer, sheet_name='Summary', index=False, startrow=1, header=False)
-        
-        summary_sheet = writer.sheets['Summary']
+        summary_sheet = workbook.add_worksheet('Summary')
         summary_sheet.write_row('A1', ['Field', 'Value'], header_format)
+        for row, (field, value) in enumerate(header_data.items(), start=1):
+            summary_sheet.write_string(row, 0, field, cell_format)
+            summary_sheet.write_string(row, 1, str(value), cell_format)
         summary_sheet.set_column('A:A', 20)
         summary_sheet.set_column('B:B', 30)
         
-        # Sheet 2: Transactions
-        if not df.empty:
-            df.to_excel(writer, sheet_name='Transactions', index=False, startrow=1, header=False)
-            
-            trans_sheet = writer.sheets['Transactions']
-            for col_num, column in enumerate(df.columns):
-                trans_sheet.write(0, col_num, column, header_format)
+        # Sheet 2: Transactions - written cell by cell, no DataFrame round trip
+        if transactions:
+            trans_sheet = workbook.add_worksheet('Transactions')
+            trans_sheet.write_row(0, 0, TRANSACTION_COLUMNS, header_format)
             
-            # Format Amount column
-            amount_col = df.columns.get_loc('Amount') if 'Amount' in df.columns else -1
-            if amount_col >= 0:
-                for row in range(len(df)):
-                    trans_sheet.write(row + 1, amount_col, df.iloc[row]['Amount'], money_format)
+            for row, t in enumerate(transactions, start=1):
+                trans_sheet.write_string(row, 0, t["Date"], cell_format)
+                trans_sheet.write_string(row, 1, t["Description"], cell_format)
+                trans_sheet.write_string(row, 2, t["Type"], cell_format)
+                trans_sheet.write_number(row, 3, t["Amount"], money_format)
             
             # Set column widths
             trans_sheet.set_column('A:A', 12)  # Date
@@ -198,40 +321,148 @@ def generate_excel(header_data: Dict[str, Any], df: pd.DataFrame, output_path: s
             trans_sheet.set_column('D:D', 15)  # Amount
 
 
+def generate_csv(transactions: List[Dict[str, Any]], output: TextIO) -> None:
+    """
+    Writes the transactions as plain CSV. Much cheaper than building an
+    .xlsx, at the cost of the Summary sheet and formatting.
+    """
+    writer = csv.DictWriter(output, fieldnames=TRANSACTION_COLUMNS)
+    writer.writeheader()
+    writer.writerows(transactions)
+
+
+def _parse_and_generate(pdf_data: bytes, output_format: str) -> Optional[bytes]:
+    """
+    Parses the statement and builds the output file ('xlsx' or 'csv') in
+    one call so it can run in a worker process. Returns the file bytes,
+    or None when no transactions were found.
+    """
+    header, transactions = extract_statement_data(pdf_data)
+    if not transactions:
+        return None
+    
+    if output_format == "csv":
+        text_buffer = io.StringIO()
+        generate_csv(transactions, text_buffer)
+        return text_buffer.getvalue().encode("utf-8")
+    
+    buffer = io.BytesIO()
+    generate_excel(header, transactions, buffer)
+    return buffer.getvalue()
+
+
 # --- API LAYER (FastAPI) ---
 
-app = FastAPI(title="Bank Statement Converter")
+# Parsing is CPU-bound, so it runs in worker processes to keep the event
+# loop free. Created on first use so importing the app stays cheap.
+_POOL: Optional[Executor] = None
+
+
+def get_pool() -> Executor:
+    global _POOL
+    if _POOL is None:
+        try:
+            # spawn, not fork: this runs inside a request, after anyio's
+            # worker threads exist, and forking a threaded process can
+            # deadlock the child
+            _POOL = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        except (OSError, NotImplementedError):
+            # Runtimes without /dev/shm (e.g. serverless) can't host a
+            # process pool. A single thread still keeps the work off the
+            # event loop; more would call into PDFium concurrently, and
+            # PDFium is not thread-safe
+            _POOL = ThreadPoolExecutor(max_workers=1)
+    return _POOL
+
+
+def discard_pool(pool: Executor, wait: bool = False) -> None:
+    """
+    Shuts the pool down and, if it is still the current one, clears it so
+    the next get_pool() builds a fresh pool.
+    """
+    global _POOL
+    if _POOL is pool:
+        _POOL = None
+    pool.shutdown(wait=wait, cancel_futures=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    if _POOL is not None:
+        discard_pool(_POOL, wait=True)
+
+
+app = FastAPI(title="Bank Statement Converter", lifespan=lifespan)
 
 BASE_DIR = Path(__file__).resolve().parent
 STATIC_DIR = BASE_DIR / "static"
 
-# Use system temp directory (works on Vercel's read-only filesystem)
-TEMP_DIR = Path(tempfile.gettempdir())
+# Supported ?format= values and their media types
+OUTPUT_MEDIA_TYPES = {
+    "xlsx": 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    "csv": 'text/csv',
+}
+
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
 
+# Recent outputs keyed by format and SHA-256 of the upload. The output is
+# deterministic for a given PDF, so identical uploads skip reparsing.
+RESULT_CACHE_SIZE = 32
+_RESULT_CACHE: "OrderedDict[str, bytes]" = OrderedDict()
 
 @app.post("/convert")
-async def convert_statement(file: UploadFile = File(...)):
+async def convert_statement(file: UploadFile = File(...), output_format: str = Query("xlsx", alias="format")):
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
+    if output_format not in OUTPUT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'xlsx' or 'csv'.")
 
-    temp_pdf = TEMP_DIR / f"temp_{file.filename}"
-    output_xlsx = TEMP_DIR / f"converted_{os.path.splitext(file.filename)[0]}.xlsx"
+    # The upload name is untrusted; it is only used, sanitized, in the
+    # Content-Disposition header
+    safe_name = _SAFE_NAME_RE.sub('_', file.filename[:-len('.pdf')])
+    output_name = f"converted_{safe_name}.{output_format}"
     
     try:
-        with open(temp_pdf, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        header, df = extract_statement_data(str(temp_pdf))
+        # Read the upload in chunks, hashing it on the way through. The PDF
+        # and the finished file are passed around in memory; only
+        # xlsxwriter's short-lived part files (see generate_excel) use /tmp
+        digest = hashlib.sha256()
+        chunks = []
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            chunks.append(chunk)
+        key = f"{output_format}:{digest.hexdigest()}"
         
-        if df.empty:
-            raise HTTPException(status_code=422, detail="Could not extract any transactions. The PDF format might not be supported.")
-        
-        generate_excel(header, df, str(output_xlsx))
+        content = _RESULT_CACHE.get(key)
+        if content is None:
+            pool = get_pool()
+            try:
+                content = await asyncio.get_running_loop().run_in_executor(
+                    pool, _parse_and_generate, b"".join(chunks), output_format
+                )
+            except BrokenProcessPool:
+                # A worker died (OOM kill, crash inside pdfium). A broken pool
+                # rejects every later submit, so replace it for the next request
+                discard_pool(pool)
+                raise HTTPException(status_code=500, detail="The converter crashed on this file. Please try again.")
+            
+            if content is None:
+                raise HTTPException(status_code=422, detail="Could not extract any transactions. The PDF format might not be supported.")
+            
+            _RESULT_CACHE[key] = content
+            if len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+        else:
+            _RESULT_CACHE.move_to_end(key)
         
-        return FileResponse(
-            output_xlsx, 
-            media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 
-            filename=output_xlsx.name
+        return Response(
+            content=content,
+            media_type=OUTPUT_MEDIA_TYPES[output_format],
+            headers={'Content-Disposition': f'attachment; filename="{output_name}"'}
         )
 
     except HTTPException:
@@ -240,10 +471,6 @@ async def convert_statement(file: UploadFile = File(...)):
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
-        
-    finally:
-        if temp_pdf.exists():
-            os.remove(temp_pdf)
 
 
 # Serve static files